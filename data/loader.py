@@ -3,16 +3,27 @@ from __future__ import annotations
 
 import io
 import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
 import zipfile
-import xml.etree.ElementTree as ET
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, List, Union
 
 import feedparser
+import numpy as np
 import pandas as pd
 import requests
 import streamlit as st
 from dateutil import parser
+from lxml import etree
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # 프로젝트 설정 파일 import
 import config
@@ -25,6 +36,171 @@ try:
 except ImportError:
     _GSPREAD_AVAILABLE = False
 
+try:
+    import ahocorasick
+    _AHOCORASICK_AVAILABLE = True
+except ImportError:
+    _AHOCORASICK_AVAILABLE = False
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _to_category(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """반복 값이 많은 문자열 컬럼을 category dtype으로 변환 (없는 컬럼은 무시)"""
+    for col in columns:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+# DART API 요청 타임아웃 (연결, 읽기) 초
+_DART_TIMEOUT = (3.05, 15)
+
+
+# 재무제표 응답 디스크 캐시 (정정보고서 반영을 위해 일정 기간 후 다시 조회)
+_DART_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "dart.sqlite"
+)
+_DART_CACHE_TTL = 7 * 86400  # 초
+
+
+def _dart_cache_connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(_DART_CACHE_PATH), exist_ok=True)
+    conn = sqlite3.connect(_DART_CACHE_PATH, timeout=10)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS fnltt ("
+        " corp_code TEXT, year TEXT, report_code TEXT, fs_div TEXT,"
+        " payload BLOB, fetched_at INTEGER,"
+        " PRIMARY KEY (corp_code, year, report_code, fs_div))"
+    )
+    return conn
+
+
+def _dart_cache_get(key: tuple) -> List[dict] | None:
+    """캐시된 'list' 반환 (없거나 만료됐거나 캐시 오류 시 None)"""
+    try:
+        with closing(_dart_cache_connect()) as conn:
+            hit = conn.execute(
+                "SELECT payload FROM fnltt"
+                " WHERE corp_code=? AND year=? AND report_code=? AND fs_div=? AND fetched_at>=?",
+                (*key, int(time.time()) - _DART_CACHE_TTL),
+            ).fetchone()
+        return _json_loads(hit[0]) if hit else None
+    except (sqlite3.Error, OSError, ValueError):
+        return None
+
+
+def _dart_cache_put(key: tuple, rows: List[dict]) -> None:
+    try:
+        with closing(_dart_cache_connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO fnltt VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, _json_dumps(rows), int(time.time())),
+            )
+    except (sqlite3.Error, OSError):
+        pass  # 캐시 저장 실패는 무시 (다음 실행에서 다시 조회)
+
+
+def _fetch_corp_code_zip(api_key: str, session: requests.Session) -> bytes:
+    """corpCode.xml ZIP 원본을 받아온다. 오늘 받은 파일이 임시 디렉터리에 있으면 재사용"""
+    cache_path = os.path.join(tempfile.gettempdir(), "dart_corpCode.zip")
+    try:
+        fresh = datetime.fromtimestamp(os.path.getmtime(cache_path)).date() == datetime.now().date()
+    except OSError:
+        fresh = False
+    if fresh and zipfile.is_zipfile(cache_path):  # 깨진 파일(중단된 저장 등)이면 다시 받음
+        with open(cache_path, "rb") as f:
+            return f.read()
+
+    url = f"https://opendart.fss.or.kr/api/corpCode.xml?crtfc_key={api_key}"
+    res = session.get(url, timeout=_DART_TIMEOUT)
+    res.raise_for_status()
+    content = res.content
+    if zipfile.is_zipfile(io.BytesIO(content)):  # 오류 응답(XML)은 저장하지 않음
+        # 임시 파일에 다 쓴 뒤 교체해 다른 세션이 잘린 파일을 읽지 않도록 함
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".part")
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return content
+
+
+@st.cache_resource(ttl=86400, show_spinner=False)
+def _load_corp_code_index(api_key: str, _session: requests.Session) -> tuple[Dict[str, str], Dict[str, str]]:
+    """corpCode.xml을 한 번만 파싱해 (종목코드→고유코드, 회사명→고유코드) dict 반환
+       복사 없이 모든 세션이 공유하므로 호출 측은 읽기만 해야 함"""
+    stock_dict: Dict[str, str] = {}
+    name_dict: Dict[str, str] = {}
+    with zipfile.ZipFile(io.BytesIO(_fetch_corp_code_zip(api_key, _session))) as z:
+        with z.open(z.namelist()[0]) as xml_file:
+            # 전체 트리를 만들지 않고 <list> 단위로 스트리밍 파싱 (메모리 일정 유지)
+            for _, corp in etree.iterparse(xml_file, events=("end",), tag="list"):
+                corp_name = corp.findtext("corp_name")
+                corp_code = corp.findtext("corp_code")
+                stock_code = corp.findtext("stock_code")
+
+                if corp_name is not None and corp_code is not None:
+                    # 동일 키가 여러 번 나오면 먼저 나온 항목 우선 (기존 선형 탐색과 동일)
+                    name_dict.setdefault(corp_name, corp_code)
+                    if stock_code and stock_code.strip():
+                        stock_dict.setdefault(stock_code.strip(), corp_code)
+
+                corp.clear()
+                while corp.getprevious() is not None:
+                    del corp.getparent()[0]
+    return stock_dict, name_dict
+
+
+# 분기 재무지표별 계정명 검색 키워드 (우선순위 순, 소문자)
+_METRIC_KEYWORDS = {
+    '매출액':     ('매출액', 'revenue', 'sales'),
+    '매출원가':   ('매출원가', 'cost of sales'),
+    '매출총이익': ('매출총이익', 'gross profit', '총이익'),
+    '영업이익':   ('영업이익', 'operating profit', '영업손익'),
+    '당기순이익': ('당기순이익', 'net income', '순이익'),
+    '판관비':     ('판매비와관리비', '판관비', 'selling and administrative'),
+    '판매비':     ('판매비', 'selling expenses'),
+    '관리비':     ('관리비', 'administrative expenses'),
+}
+_METRICS = tuple(_METRIC_KEYWORDS)
+_SALES, _COGS, _GROSS, _OP_PROFIT, _NET_INCOME, _SGA = (
+    _METRICS.index(m) for m in ('매출액', '매출원가', '매출총이익', '영업이익', '당기순이익', '판관비')
+)
+
+# 표시용 컬럼 스키마: 금액(원 → 조원/억원, 나눗셈 대신 역수 곱) / 매출액 대비 비율
+_AMOUNT_IDX = np.array([_SALES, _COGS, _GROSS, _OP_PROFIT, _NET_INCOME, _SGA])
+_AMOUNT_SCALE = np.array([1e-12, 1e-12, 1e-12, 1e-8, 1e-8, 1e-8])
+_AMOUNT_COLS = ('매출액(조원)', '매출원가(조원)', '매출총이익(조원)', '영업이익(억원)', '당기순이익(억원)', '판관비(억원)')
+_RATIO_IDX = np.array([_OP_PROFIT, _GROSS, _NET_INCOME, _COGS])
+_RATIO_COLS = ('영업이익률(%)', '매출총이익률(%)', '순이익률(%)', '매출원가율(%)')
+
+_ALL_METRIC_KEYWORDS = tuple(dict.fromkeys(kw for kws in _METRIC_KEYWORDS.values() for kw in kws))
+
+_AMOUNT_STRIP_RE = re.compile(r'[(),\s]')
+
+
+def _parse_amount(raw) -> float:
+    """DART 금액 문자열('1,234', '(1,234)', '-')을 float으로 변환. 괄호는 음수"""
+    val = str(raw)
+    negative = '(' in val and ')' in val
+    val = _AMOUNT_STRIP_RE.sub('', val)
+    if val in ('-', ''):
+        return 0.0
+    return -float(val) if negative else float(val)
+
 
 class DartAPICollector:
     """DART API를 통해 재무 데이터를 수집하는 클래스"""
@@ -33,61 +209,64 @@ class DartAPICollector:
         self.source_tracking = {}
         self.company_name_mapping = config.COMPANY_NAME_MAPPING
         self.stock_code_mapping = config.STOCK_CODE_MAPPING
+        # TCP/TLS 연결 재사용 + 429/5xx 재시도용 세션
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = "gzip"
+        retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        self.session.mount(
+            "https://", HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+        )
 
     def get_corp_code_enhanced(self, company_name):
-        url = f"https://opendart.fss.or.kr/api/corpCode.xml?crtfc_key={self.api_key}"
         search_names = self.company_name_mapping.get(company_name, [company_name])
         
         try:
-            res = requests.get(url)
-            with zipfile.ZipFile(io.BytesIO(res.content)) as z:
-                xml_file = z.open(z.namelist()[0])
-                tree = ET.parse(xml_file)
-                root = tree.getroot()
-            
-            all_companies = []
-            for corp in root.findall("list"):
-                corp_name_elem = corp.find("corp_name")
-                corp_code_elem = corp.find("corp_code")
-                stock_code_elem = corp.find("stock_code")
-                
-                if corp_name_elem is not None and corp_code_elem is not None:
-                    all_companies.append({
-                        'name': corp_name_elem.text,
-                        'code': corp_code_elem.text,
-                        'stock_code': stock_code_elem.text.strip() if stock_code_elem is not None and stock_code_elem.text else None
-                    })
+            stock_dict, name_dict = _load_corp_code_index(self.api_key, self.session)
             
             for search_name in search_names:
                 if search_name.isdigit(): # 종목코드로 검색
-                    for company in all_companies:
-                        if company['stock_code'] == search_name:
-                            return company['code']
+                    code = stock_dict.get(search_name)
+                    if code:
+                        return code
                 
-                for company in all_companies: # 정확히 일치
-                    if company['name'] == search_name:
-                        return company['code']
+                code = name_dict.get(search_name) # 정확히 일치
+                if code:
+                    return code
             
             return None
         except Exception as e:
             st.error(f"회사 코드 조회 오류: {e}")
             return None
 
-    def get_financial_statement(self, corp_code, bsns_year, reprt_code, fs_div="CFS"):
+    def get_financial_statement_rows(self, corp_code, bsns_year, reprt_code, fs_div="CFS") -> List[dict]:
+        """fnlttSinglAcntAll 응답의 'list'를 DataFrame 변환 없이 그대로 반환 (실패 시 빈 list)
+           정상 응답은 디스크에 캐시해 재실행 시 HTTP 요청을 생략"""
+        cache_key = (corp_code, bsns_year, reprt_code, fs_div)
+        cached = _dart_cache_get(cache_key)
+        if cached is not None:
+            return cached
+
         url = "https://opendart.fss.or.kr/api/fnlttSinglAcntAll.json"
         params = {
             "crtfc_key": self.api_key, "corp_code": corp_code, "bsns_year": bsns_year,
             "reprt_code": reprt_code, "fs_div": fs_div
         }
         try:
-            res = requests.get(url, params=params).json()
+            res = _json_loads(self.session.get(url, params=params, timeout=_DART_TIMEOUT).content)
             if res.get("status") == "000" and "list" in res:
-                df = pd.DataFrame(res["list"])
-                df["보고서구분"] = reprt_code
-                return df
-            return pd.DataFrame()
+                _dart_cache_put(cache_key, res["list"])
+                return res["list"]
+            return []
         except Exception:
+            return []
+
+    def get_financial_statement(self, corp_code, bsns_year, reprt_code, fs_div="CFS"):
+        rows = self.get_financial_statement_rows(corp_code, bsns_year, reprt_code, fs_div)
+        if not rows:
             return pd.DataFrame()
+        df = pd.DataFrame(rows)
+        df["보고서구분"] = reprt_code
+        return df
 
     def get_company_financials_auto(self, company_name, bsns_year):
         corp_code = self.get_corp_code_enhanced(company_name)
@@ -140,64 +319,60 @@ class QuarterlyDataCollector:
             "Q4": "연간(사업보고서)",
         }
 
-    def _extract_raw_amounts(self, df, column='thstrm_amount'):
-        """지정 컬럼에서 원시값(원 단위)을 dict로 반환
+    def _extract_raw_amounts(self, rows, column='thstrm_amount'):
+        """DART 계정 행(list[dict])의 지정 컬럼에서 원시값(원 단위)을 _METRICS 순서 배열로 반환
            column: 'thstrm_amount'(당기금액) 또는 'thstrm_add_amount'(당기누계)"""
-        def find_amount(keywords):
-            for keyword in keywords:
-                rows = df[df['account_nm'].str.contains(keyword, case=False, na=False)]
-                if not rows.empty:
-                    try:
-                        raw = rows.iloc[0].get(column, '0')
-                        val = str(raw).replace(',', '')
-                        # 괄호 음수
-                        if '(' in val and ')' in val:
-                            val = f"-{val.strip('()')}"
-                        if val.strip() in ['-', '']:
-                            return 0.0
-                        return float(val)
-                    except Exception:
-                        continue
-            return 0.0
-
-        return {
-            '매출액':     find_amount(['매출액', 'revenue', 'sales']),
-            '매출원가':   find_amount(['매출원가', 'cost of sales']),
-            '매출총이익': find_amount(['매출총이익', 'gross profit', '총이익']),
-            '영업이익':   find_amount(['영업이익', 'operating profit', '영업손익']),
-            '당기순이익': find_amount(['당기순이익', 'net income', '순이익']),
-            '판관비':     find_amount(['판매비와관리비', '판관비', 'selling and administrative']),
-            '판매비':     find_amount(['판매비', 'selling expenses']),
-            '관리비':     find_amount(['관리비', 'administrative expenses']),
-        }
+        # 한 번의 순회로 키워드별 '처음 일치한 행'의 값만 기록
+        first_hit = {}
+        pending = list(_ALL_METRIC_KEYWORDS)
+        for item in rows:
+            nm = str(item.get('account_nm') or '').lower()
+            matched = [kw for kw in pending if kw in nm]
+            if matched:
+                amt = item.get(column, '0')
+                for kw in matched:
+                    first_hit[kw] = amt
+                pending = [kw for kw in pending if kw not in first_hit]
+                if not pending:
+                    break
+
+        # 지표별 키워드 우선순위대로 값 결정 (파싱 실패 시 다음 키워드)
+        result = np.zeros(len(_METRICS))
+        for i, keywords in enumerate(_METRIC_KEYWORDS.values()):
+            for kw in keywords:
+                if kw not in first_hit:
+                    continue
+                try:
+                    result[i] = _parse_amount(first_hit[kw])
+                    break
+                except ValueError:
+                    continue
+        return result
 
 
     def _build_display_row(self, company_name, year, label, raw, report_name=None):
-        """표시용(조원/억원 & 비율) 행 생성: raw는 '원' 단위 당기(or 연간) dict"""
+        """표시용(조원/억원 & 비율) 행 생성: raw는 '원' 단위 당기(or 연간) 값 배열(_METRICS 순서)
+           표시 대상 금액이 하나도 없으면 None"""
+        amounts_raw = raw[_AMOUNT_IDX]
+        if not amounts_raw.any():
+            return None
+
         row = {'회사': company_name, '연도': year, '분기': label}
         if report_name:
             row['보고서구분'] = report_name
 
-        # 금액 변환
-        if raw.get('매출액'):     row['매출액(조원)']     = raw['매출액']     / 1_000_000_000_000
-        if raw.get('매출원가'):   row['매출원가(조원)']   = raw['매출원가']   / 1_000_000_000_000
-        if raw.get('매출총이익'): row['매출총이익(조원)'] = raw['매출총이익'] / 1_000_000_000_000
-        if raw.get('영업이익'):   row['영업이익(억원)']   = raw['영업이익']   / 100_000_000
-        if raw.get('당기순이익'): row['당기순이익(억원)'] = raw['당기순이익'] / 100_000_000
-        if raw.get('판관비'):     row['판관비(억원)']     = raw['판관비']     / 100_000_000
+        # 금액 변환 (0인 항목은 생략)
+        amounts = amounts_raw * _AMOUNT_SCALE
+        row.update((col, v) for col, v in zip(_AMOUNT_COLS, amounts.tolist()) if v)
 
         # 비율(분모: 매출액)
-        sales = raw.get('매출액', 0)
+        sales = raw[_SALES]
         if sales:
-            if '영업이익'   in raw: row['영업이익률(%)']   = (raw['영업이익']   / sales) * 100
-            if '매출총이익' in raw: row['매출총이익률(%)'] = (raw['매출총이익'] / sales) * 100
-            if '당기순이익' in raw: row['순이익률(%)']     = (raw['당기순이익'] / sales) * 100
-            if '매출원가'   in raw: row['매출원가율(%)']   = (raw['매출원가']   / sales) * 100
+            ratios = raw[_RATIO_IDX] * (100 / sales)
+            row.update(zip(_RATIO_COLS, ratios.tolist()))
         return row
 
     def collect_quarterly_data(self, company_name, year=2024):
-        import pandas as pd
-
         corp_code = self.dart_collector.get_corp_code_enhanced(company_name)
         if not corp_code:
             return pd.DataFrame()
@@ -205,126 +380,148 @@ class QuarterlyDataCollector:
         st.info(f"🔍 {company_name} {year}년 분기별 데이터(당기/연간) 산출 중...")
 
         # (1) 보고서별 원시값 수집: 당기(curr) / 누계(cum) 둘 다 준비
-        curr, cum = {}, {}
-        for q, code in self.report_codes.items():
-            df = self.dart_collector.get_financial_statement(corp_code, str(year), code)
-            if df.empty:
+        #     행 = 분기(report_codes 순서: Q1~Q4), 열 = _METRICS
+        quarters = list(self.report_codes)
+        curr = np.zeros((len(quarters), len(_METRICS)))
+        cum = np.zeros_like(curr)
+        present = np.zeros(len(quarters), dtype=bool)
+        # 4개 보고서 HTTP 요청은 동시에 보내고, 결과 처리는 보고서 순서대로
+        with ThreadPoolExecutor(max_workers=len(self.report_codes)) as ex:
+            futures = [
+                ex.submit(self.dart_collector.get_financial_statement_rows, corp_code, str(year), code)
+                for code in self.report_codes.values()
+            ]
+        for i, (q, future) in enumerate(zip(quarters, futures)):
+            fs_rows = future.result()
+            if not fs_rows:
                 st.warning(f"⚠️ {self.quarter_names[q]} 데이터 없음")
                 continue
+            present[i] = True
             # 당기금액(분기 금액)
-            curr[q] = self._extract_raw_amounts(df, column='thstrm_amount')
+            curr[i] = self._extract_raw_amounts(fs_rows, column='thstrm_amount')
             # 누적금액(없으면 당기로 대체)
-            if 'thstrm_add_amount' in df.columns:
-                cum[q] = self._extract_raw_amounts(df, column='thstrm_add_amount')
+            if any('thstrm_add_amount' in item for item in fs_rows):
+                cum[i] = self._extract_raw_amounts(fs_rows, column='thstrm_add_amount')
             else:
-                cum[q] = curr[q]
+                cum[i] = curr[i]
 
-        if not curr:
+        if not present.any():
             st.error("❌ 분기 데이터 수집 실패")
             return pd.DataFrame()
 
-        # (2) dict 합/차 유틸
-        def add_dicts(*dicts):
-            keys = set().union(*[d.keys() for d in dicts if d])
-            return {k: sum(float(d.get(k, 0) or 0) for d in dicts if d) for k in keys}
-
-        def sub_dict(a, b):
-            keys = set(a.keys()) | set(b.keys())
-            return {k: float(a.get(k, 0) or 0) - float(b.get(k, 0) or 0) for k in keys}
-
-        # (3) 당기 산출: Q1~Q3는 ‘당기금액’을 그대로, Q4만 연산
-        q1 = curr.get('Q1', {})
-        q2 = curr.get('Q2', {})  # ✅ 더 이상 빼지 않음
-        q3 = curr.get('Q3', {})  # ✅ 더 이상 빼지 않음
-
-        # ✅ Q4(당기) = 연간(당기) − (Q1당기 + Q2당기 + Q3당기)
-        if 'Q4' in curr:
-            q4 = sub_dict(curr['Q4'], add_dicts(q1, q2, q3))
-        else:
-            q4 = {}
+        # (2) 당기 산출: Q1~Q3는 ‘당기금액’을 그대로, Q4만 연산
+        q4_idx = quarters.index('Q4')
+        # ✅ Q4(당기) = 연간(당기) − (Q1당기 + Q2당기 + Q3당기)  (없는 분기는 0)
+        q4 = curr[q4_idx] - np.delete(curr, q4_idx, axis=0).sum(axis=0)
 
         # (디버그) 확인
-        if 'Q4' in curr:
+        if present[q4_idx]:
+            sales = [curr[i, _SALES] if present[i] else None for i in range(len(quarters))]
             st.caption(
                 "🧪 산식 확인 | "
-                f"연간(당기) 매출={curr['Q4'].get('매출액')} / "
-                f"Q1={q1.get('매출액')} / Q2={q2.get('매출액')} / Q3={q3.get('매출액')} / "
-                f"Q4(연간-합계)={q4.get('매출액')}"
+                f"연간(당기) 매출={sales[q4_idx]} / "
+                f"Q1={sales[0]} / Q2={sales[1]} / Q3={sales[2]} / "
+                f"Q4(연간-합계)={q4[_SALES]}"
             )
 
-        # (4) 표 생성: Q1~Q4(당기) + 연간(누적)
+        # (3) 표 생성: Q1~Q4(당기) + 연간(누적)
         rows = []
-        if q1: rows.append(self._build_display_row(company_name, year, f"{year}Q1", q1, "1분기(당기)"))
-        if q2: rows.append(self._build_display_row(company_name, year, f"{year}Q2", q2, "2분기(당기)"))
-        if q3: rows.append(self._build_display_row(company_name, year, f"{year}Q3", q3, "3분기(당기)"))
-        if q4: rows.append(self._build_display_row(company_name, year, f"{year}Q4", q4, "4분기(당기)"))  # 10/01~12/31
-        # 연간 행은 누적(cum['Q4'])로 표시 (없으면 당기와 동일)
-        if 'Q4' in cum:
-            rows.append(self._build_display_row(company_name, year, f"{year} 연간", cum['Q4'], "연간(사업보고서)"))
+        for i, q in enumerate(quarters):
+            if not present[i]:
+                continue
+            raw = q4 if i == q4_idx else curr[i]  # Q4: 10/01~12/31
+            rows.append(self._build_display_row(company_name, year, f"{year}{q}", raw, f"{q[1]}분기(당기)"))
+        # 연간 행은 누적(cum Q4)로 표시 (없으면 당기와 동일)
+        if present[q4_idx]:
+            rows.append(self._build_display_row(company_name, year, f"{year} 연간", cum[q4_idx], "연간(사업보고서)"))
+        # 값이 전혀 없는 분기(계정 미매칭)는 표에서 제외
+        rows = [row for row in rows if row is not None]
+
+        result = pd.DataFrame(rows)
+        return _to_category(result, ['보고서구분'])
+
+
+# RSS 피드 요청 타임아웃 (연결, 읽기) 초
+_RSS_TIMEOUT = (3.05, 10)
+
+
+def _feed_cache_store() -> dict:
+    """Streamlit 세션별 피드 캐시 (URL → ETag/Last-Modified/파싱 결과)
+       세션 밖(스크립트 실행 등)에서는 인스턴스 전용 dict 사용"""
+    try:
+        return st.session_state.setdefault("rss_feed_cache", {})
+    except Exception:
+        return {}
+
+
+# 뉴스 텍스트 정리용 정규식
+_TAG_RE = re.compile(r'<[^>]+>')
+_PUNCT_RE = re.compile(r'[^\w\s가-힣\-\.\,\!\?\(\)]')
+_WS_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_cached(date_str: str) -> str | None:
+    """피드 날짜 문자열을 'YYYY-MM-DD HH:MM'으로 변환 (실패 시 None)
+       RFC 822 / ISO 8601은 바로 처리하고, 그 외 형식만 dateutil로 파싱"""
+    try:
+        return datetime.strptime(date_str, "%a, %d %b %Y %H:%M:%S %z").strftime("%Y-%m-%d %H:%M")
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(date_str).strftime("%Y-%m-%d %H:%M")
+    except (TypeError, ValueError):
+        pass
+    try:
+        return parser.parse(date_str).strftime("%Y-%m-%d %H:%M")
+    except Exception:
+        return None
 
-        return pd.DataFrame(rows)
 
+def _keyword_regex(keywords: List[str]) -> re.Pattern:
+    """소문자 텍스트에서 키워드 중 하나라도 포함되는지 검사하는 정규식"""
+    return re.compile('|'.join(re.escape(kw.lower()) for kw in keywords))
 
 
+# 영향도: 핵심 비즈니스 용어 가중치
+_IMPORTANCE_WEIGHTS = {
+    "영업이익": 3, "실적": 3, "손실": 3, "투자": 2, "매출": 2,
+    "수익성": 2, "사업확장": 2, "원가절감": 2, "효율성": 2
+}
 
+# 회사명 추출: 소문자 검색어 → 표준 회사명 (앞쪽 우선)
+_COMPANY_NAME_MAP = {
+    "sk에너지": "SK에너지",
+    "sk이노베이션": "SK이노베이션",
+    "gs칼텍스": "GS칼텍스",
+    "hd현대오일뱅크": "HD현대오일뱅크",
+    "현대오일뱅크": "HD현대오일뱅크",
+    "s-oil": "S-Oil",
+    "에쓰오일": "S-Oil"
+}
+
+# SK 관련도: SK / 정유·에너지 산업 / 경쟁사 검색어
+_SK_TERMS = ["sk", "에스케이", "sk에너지", "sk이노베이션"]
+_REFINERY_TERMS = ["정유", "석유", "화학", "에너지"]
+_COMPETITOR_TERMS = ["gs칼텍스", "현대오일뱅크", "s-oil", "에쓰오일"]
+
+
+def _build_automaton(terms: List[str]):
+    """검색어 목록으로 Aho-Corasick 오토마톤 생성 (값 = 검색어 인덱스)"""
+    automaton = ahocorasick.Automaton()
+    for j, term in enumerate(terms):
+        automaton.add_word(term, j)
+    automaton.make_automaton()
+    return automaton
 
-    def _extract_key_metrics(self, df, quarter, year):
-        # 분기 표시를 더 명확하게 (예: 2024Q1, 2024Q2 등)
-        quarter_display = f"{year}{quarter}"
-        metrics = {'분기': quarter_display}
-        
-        def find_amount(keywords):
-            for keyword in keywords:
-                rows = df[df['account_nm'].str.contains(keyword, case=False, na=False)]
-                if not rows.empty:
-                    try:
-                        return float(str(rows.iloc[0]['thstrm_amount']).replace(',', '').replace('-', '0'))
-                    except:
-                        continue
-            return 0
-
-        # 핵심 재무지표 추출
-        revenue = find_amount(['매출액', 'revenue', 'sales'])
-        cost_of_sales = find_amount(['매출원가', 'cost of sales', '매출원가'])
-        gross_profit = find_amount(['매출총이익', 'gross profit', '총이익'])
-        operating_profit = find_amount(['영업이익', 'operating profit', '영업손익'])
-        net_income = find_amount(['당기순이익', 'net income', '순이익'])
-        selling_expenses = find_amount(['판매비', 'selling expenses'])
-        administrative_expenses = find_amount(['관리비', 'administrative expenses'])
-        sg_and_a = find_amount(['판매비와관리비', '판관비', 'selling and administrative'])
-
-        # 금액 단위 변환 및 저장
-        if revenue > 0:
-            metrics['매출액(조원)'] = revenue / 1_000_000_000_000
-        if cost_of_sales > 0:
-            metrics['매출원가(조원)'] = cost_of_sales / 1_000_000_000_000
-        if gross_profit > 0:
-            metrics['매출총이익(조원)'] = gross_profit / 1_000_000_000_000
-        if operating_profit > 0:
-            metrics['영업이익(억원)'] = operating_profit / 100_000_000
-        if net_income > 0:
-            metrics['당기순이익(억원)'] = net_income / 100_000_000
-        if selling_expenses > 0:
-            metrics['판매비(억원)'] = selling_expenses / 100_000_000
-        if administrative_expenses > 0:
-            metrics['관리비(억원)'] = administrative_expenses / 100_000_000
-        if sg_and_a > 0:
-            metrics['판관비(억원)'] = sg_and_a / 100_000_000
-
-        # 비율 계산
-        if '매출액(조원)' in metrics and '영업이익(억원)' in metrics and metrics['매출액(조원)'] > 0:
-            metrics['영업이익률(%)'] = (metrics['영업이익(억원)'] * 100) / (metrics['매출액(조원)'] * 10_000)
-        
-        if '매출액(조원)' in metrics and '매출총이익(조원)' in metrics and metrics['매출액(조원)'] > 0:
-            metrics['매출총이익률(%)'] = (metrics['매출총이익(조원)'] / metrics['매출액(조원)']) * 100
-        
-        if '매출액(조원)' in metrics and '당기순이익(억원)' in metrics and metrics['매출액(조원)'] > 0:
-            metrics['순이익률(%)'] = (metrics['당기순이익(억원)'] * 100) / (metrics['매출액(조원)'] * 10_000)
-        
-        if '매출액(조원)' in metrics and '매출원가(조원)' in metrics and metrics['매출액(조원)'] > 0:
-            metrics['매출원가율(%)'] = (metrics['매출원가(조원)'] / metrics['매출액(조원)']) * 100
-        
-        return metrics if len(metrics) > 1 else None
+
+def _contains_matrix(text: pd.Series, terms: List[str]) -> np.ndarray:
+    """(행 수 × 검색어 수) bool 행렬: text[i]에 terms[j]가 포함되면 True"""
+    if not terms:
+        return np.zeros((len(text), 0), dtype=bool)
+    return np.column_stack([
+        text.str.contains(term, regex=False).to_numpy(dtype=bool) for term in terms
+    ])
 
 
 class SKNewsCollector:
@@ -333,6 +530,12 @@ class SKNewsCollector:
         self.sheet_id = config.SHEET_ID
         self.service_account_json = config.GOOGLE_SERVICE_ACCOUNT_JSON
         self.rss_feeds = config.DEFAULT_RSS_FEEDS
+        # 피드 병렬 수집 시 연결 재사용
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = feedparser.USER_AGENT
+        self.session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+        # 세션 상태는 작업 스레드에서 접근할 수 없으므로 여기서 dict 참조를 잡아둔다
+        self._feed_cache = _feed_cache_store()
         self.oil_keywords = custom_keywords if custom_keywords else config.BENCHMARKING_KEYWORDS
         
         # 세밀한 키워드 분류 (확장)
@@ -340,6 +543,41 @@ class SKNewsCollector:
         self.industry_keywords = ["정유", "석유화학", "에너지", "화학", "원유", "나프타", "휘발유", "경유", "정제마진", "정유업계", "석유화학사", "정유사", "석유", "유가", "WTI", "두바이유", "브렌트유"]
         self.business_keywords = ["영업이익", "실적", "수익성", "투자", "사업확장", "원가절감", "효율성", "매출", "손실", "매출액", "영업손익", "기업", "경제", "주식", "증시", "시장"]
         self.trend_keywords = ["탄소중립", "ESG", "친환경", "수소", "신재생에너지", "바이오", "디지털전환", "스마트팩토리", "그린", "친환경"]
+        self._any_keyword_re = _keyword_regex(
+            self.company_keywords + self.industry_keywords + self.business_keywords + self.trend_keywords
+        )
+
+        # 뉴스 점수 계산용: 모든 검색어(소문자)를 한 번씩만 검사하고 열 인덱스로 참조
+        self._vocab = list(dict.fromkeys(
+            kw.lower() for kw in (
+                self.company_keywords + self.industry_keywords + self.business_keywords
+                + self.trend_keywords + list(_IMPORTANCE_WEIGHTS) + list(_COMPANY_NAME_MAP)
+                + _SK_TERMS + _REFINERY_TERMS + _COMPETITOR_TERMS
+            )
+        ))
+        vocab_index = {term: i for i, term in enumerate(self._vocab)}
+        # pyahocorasick이 있으면 텍스트당 한 번의 스캔으로 모든 검색어를 찾는다
+        self._automaton = _build_automaton(self._vocab) if _AHOCORASICK_AVAILABLE else None
+
+        def cols(terms):
+            return np.array([vocab_index[t.lower()] for t in terms], dtype=np.intp)
+
+        display_keywords = list(dict.fromkeys(self.company_keywords + self.industry_keywords + self.business_keywords))
+        self._kw_display = np.array(display_keywords, dtype=object)
+        self._kw_cols = cols(display_keywords)
+        self._importance_cols = cols(_IMPORTANCE_WEIGHTS)
+        self._importance_weights = np.array(list(_IMPORTANCE_WEIGHTS.values()))
+        self._company_cols = cols(_COMPANY_NAME_MAP)
+        self._company_names = np.array(list(_COMPANY_NAME_MAP.values()), dtype=object)
+        self._sk_cols = cols(_SK_TERMS)
+        self._refinery_cols = cols(_REFINERY_TERMS)
+        self._competitor_cols = cols(_COMPETITOR_TERMS)
+        relevance_groups = [
+            (self.company_keywords, 10), (self.industry_keywords, 3),
+            (self.business_keywords, 2), (self.trend_keywords, 1),
+        ]
+        self._relevance_cols = cols([kw for kws, _ in relevance_groups for kw in kws])
+        self._relevance_weights = np.array([w for kws, w in relevance_groups for _ in kws])
 
     def collect_news(self, *, max_items_per_feed: int = 50) -> pd.DataFrame:
         df_sheets = self._fetch_sheet_news()
@@ -373,7 +611,8 @@ class SKNewsCollector:
                 df_all.sort_values(sort_columns, ascending=[False] * len(sort_columns), inplace=True)
             
             # 상위 50개만 반환 (품질 우선)
-            return df_all.head(50).reset_index(drop=True)
+            result = df_all.head(50).reset_index(drop=True)
+            return _to_category(result, ['출처', '회사'])
         else:
             return pd.DataFrame()
     
@@ -397,9 +636,13 @@ class SKNewsCollector:
         collected = []
         total_found = 0
         
-        for source, url in self.rss_feeds.items():
+        # 피드 HTTP 요청은 동시에 보내고, 파싱 결과 처리는 피드 순서대로
+        with ThreadPoolExecutor(max_workers=max(1, min(16, len(self.rss_feeds)))) as ex:
+            futures = {source: ex.submit(self._fetch_feed, url) for source, url in self.rss_feeds.items()}
+        
+        for source, future in futures.items():
             try:
-                feed = feedparser.parse(url)
+                feed = future.result()
                 source_count = 0
                 
                 for entry in feed.entries[:max_items]:
@@ -433,195 +676,135 @@ class SKNewsCollector:
         st.success(f"🎯 총 {total_found}개 뉴스 수집 완료")
         return pd.DataFrame(collected)
     
+    def _fetch_feed(self, url: str):
+        """공유 세션으로 피드를 받아 feedparser로 파싱
+           ETag/Last-Modified로 조건부 요청하고, 304면 직전 파싱 결과를 재사용"""
+        cached = self._feed_cache.get(url)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("modified"):
+                headers["If-Modified-Since"] = cached["modified"]
+
+        resp = self.session.get(url, headers=headers, timeout=_RSS_TIMEOUT)
+        if resp.status_code == 304 and cached:
+            return cached["feed"]
+        resp.raise_for_status()
+
+        # 상대 링크 해석·Content-Type 문자셋 판별을 위해 응답 헤더/URL을 함께 전달 (feedparser는 소문자 키만 인식)
+        response_headers = {k.lower(): v for k, v in resp.headers.items()}
+        response_headers["content-location"] = resp.url
+        feed = feedparser.parse(resp.content, response_headers=response_headers)
+        self._feed_cache[url] = {
+            "etag": resp.headers.get("ETag"),
+            "modified": resp.headers.get("Last-Modified"),
+            "feed": feed,
+        }
+        return feed
+    
     def _clean_text(self, text: str) -> str:
-        """텍스트 정리 및 전처리"""
+        """텍스트 정리 및 전처리 (HTML 태그 → 특수문자 → 연속 공백 순으로 제거)"""
         if not text:
             return ""
         
-        # HTML 태그 제거
-        import re
-        text = re.sub(r'<[^>]+>', '', text)
-        
-        # 특수문자 정리
-        text = re.sub(r'[^\w\s가-힣\-\.\,\!\?\(\)]', '', text)
-        
-        # 연속된 공백 제거
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip()
+        return _WS_RE.sub(' ', _PUNCT_RE.sub('', _TAG_RE.sub('', text))).strip()
 
     def _filter_relevant_news(self, df: pd.DataFrame) -> pd.DataFrame:
         """키워드 기반으로 관련성 높은 뉴스만 필터링 (완화된 기준)"""
         if df.empty:
             return df
         
-        relevant_news = []
-        for _, row in df.iterrows():
-            title = str(row.get('제목', '')).lower()
-            summary = str(row.get('요약', '')).lower()
-            full_text = f"{title} {summary}"
-            
-            # 키워드 매칭 카운트
-            keyword_count = 0
-            
-            # 회사명 키워드 (가중치 높음)
-            company_matches = sum(1 for kw in self.company_keywords if kw.lower() in full_text)
-            keyword_count += company_matches * 2
-            
-            # 산업 키워드
-            industry_matches = sum(1 for kw in self.industry_keywords if kw.lower() in full_text)
-            keyword_count += industry_matches
-            
-            # 비즈니스 키워드
-            business_matches = sum(1 for kw in self.business_keywords if kw.lower() in full_text)
-            keyword_count += business_matches
-            
-            # 트렌드 키워드
-            trend_matches = sum(1 for kw in self.trend_keywords if kw.lower() in full_text)
-            keyword_count += trend_matches
-            
-            # 완화된 필터링 기준
-            if keyword_count >= 1:  # 최소 1개 키워드만 있어도 포함
-                relevant_news.append(row)
-            # 또는 경제/기업 관련 키워드가 있으면 포함
-            elif any(kw in full_text for kw in ["기업", "경제", "주식", "투자", "매출", "실적", "영업이익"]):
-                relevant_news.append(row)
+        full_text = self._full_text(df)
         
-        return pd.DataFrame(relevant_news)
+        # 최소 1개 키워드만 있어도 포함 (회사/산업/비즈니스/트렌드 전체)
+        # 기존의 경제/기업 보조 키워드(기업·경제·주식·투자·매출·실적·영업이익)는 모두 비즈니스 키워드에 포함됨
+        mask = full_text.str.contains(self._any_keyword_re)
+        
+        return df[mask].copy()
+
+    @staticmethod
+    def _full_text(df: pd.DataFrame) -> pd.Series:
+        """'제목 요약' 소문자 텍스트 Series"""
+        title = df['제목'].fillna('').astype(str).str.lower()
+        if '요약' not in df.columns:
+            return title + ' '
+        return title + ' ' + df['요약'].fillna('').astype(str).str.lower()
 
     def _enrich_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         if df.empty: 
             return df
         
         try:
-            df["키워드"] = df["제목"].apply(self._extract_keywords)
-            df["영향도"] = df["제목"].apply(self._calc_importance)
-            df["회사"] = df["제목"].apply(self._extract_company)
-            df["SK관련도"] = df["제목"].apply(self._calc_sk_relevance)
-            df["관련도점수"] = df.apply(self._calc_relevance_score, axis=1)
+            scores = self._score_news(df)
+            # 다섯 컬럼을 한 번에 추가 (점수는 작은 정수형, 회사는 category)
+            df = df.assign(**{
+                "키워드": scores["키워드"],
+                "영향도": scores["영향도"].astype(np.int16),
+                "회사": pd.Categorical(scores["회사"]),
+                "SK관련도": scores["SK관련도"].astype(np.int16),
+                "관련도점수": scores["관련도점수"].astype(np.int32),
+            })
         except Exception as e:
             st.warning(f"뉴스 데이터 처리 중 오류 발생: {str(e)}")
             # 기본값으로 컬럼 추가
-            df["키워드"] = ""
-            df["영향도"] = 0
-            df["회사"] = "기타"
-            df["SK관련도"] = 0
-            df["관련도점수"] = 0
+            df = df.assign(**{"키워드": "", "영향도": 0, "회사": "기타", "SK관련도": 0, "관련도점수": 0})
         
         return df
 
-    def _extract_keywords(self, text: str) -> str:
-        """더 정확한 키워드 추출"""
-        text_lower = str(text).lower()
-        found_keywords = []
-        
-        # 회사명 키워드 (우선순위 높음)
-        for kw in self.company_keywords:
-            if kw.lower() in text_lower:
-                found_keywords.append(kw)
-        
-        # 산업 키워드
-        for kw in self.industry_keywords:
-            if kw.lower() in text_lower and kw not in found_keywords:
-                found_keywords.append(kw)
-        
-        # 비즈니스 키워드
-        for kw in self.business_keywords:
-            if kw.lower() in text_lower and kw not in found_keywords:
-                found_keywords.append(kw)
-        
-        return ", ".join(found_keywords[:8])  # 최대 8개까지
+    def _hit_matrix(self, text: pd.Series) -> np.ndarray:
+        """(행 수 × 검색어 수) bool 행렬: text[i]에 self._vocab[j]가 포함되면 True"""
+        if self._automaton is None:
+            return _contains_matrix(text, self._vocab)
+        hits = np.zeros((len(text), len(self._vocab)), dtype=bool)
+        for i, t in enumerate(text):
+            cols = [j for _, j in self._automaton.iter(t)]
+            if cols:
+                hits[i, cols] = True
+        return hits
+
+    def _score_news(self, df: pd.DataFrame) -> Dict[str, Union[list, np.ndarray]]:
+        """키워드/영향도/회사/SK관련도/관련도점수를 한 번에 계산
+           (키워드~SK관련도는 제목, 관련도점수는 제목+요약 기준)"""
+        title = df["제목"].fillna('').astype(str).str.lower()
+        title_hits = self._hit_matrix(title)
+        full_hits = self._hit_matrix(self._full_text(df))
+
+        # 키워드: 회사 → 산업 → 비즈니스 순, 최대 8개
+        kw_hits = title_hits[:, self._kw_cols]
+        keywords = [", ".join(self._kw_display[row][:8]) for row in kw_hits]
+
+        # 영향도: 핵심 비즈니스 용어 가중합 (최대 10)
+        importance = np.minimum(title_hits[:, self._importance_cols] @ self._importance_weights, 10)
+
+        # 회사: 매핑 순서상 처음 일치하는 회사명
+        company_hits = title_hits[:, self._company_cols]
+        company = np.where(
+            company_hits.any(axis=1), self._company_names[company_hits.argmax(axis=1)], "기타"
+        )
+
+        # SK관련도: SK(5) + 정유/에너지(2) + 경쟁사(1), 최대 10
+        sk_relevance = np.minimum(
+            5 * title_hits[:, self._sk_cols].any(axis=1)
+            + 2 * title_hits[:, self._refinery_cols].any(axis=1)
+            + 1 * title_hits[:, self._competitor_cols].any(axis=1),
+            10,
+        )
+
+        # 관련도점수: 회사 10 / 산업 3 / 비즈니스 2 / 트렌드 1 (제목+요약)
+        relevance = full_hits[:, self._relevance_cols] @ self._relevance_weights
 
-    def _calc_importance(self, text: str) -> int:
-        """영향도 계산 개선"""
-        text_lower = str(text).lower()
-        score = 0
-        
-        # 핵심 비즈니스 용어 (가중치 높음)
-        business_terms = {
-            "영업이익": 3, "실적": 3, "손실": 3, "투자": 2, "매출": 2,
-            "수익성": 2, "사업확장": 2, "원가절감": 2, "효율성": 2
-        }
-        
-        for term, weight in business_terms.items():
-            if term in text_lower:
-                score += weight
-        
-        return min(score, 10)
-
-    def _calc_sk_relevance(self, text: str) -> int:
-        """SK 관련도 계산 개선"""
-        text_lower = str(text).lower()
-        score = 0
-        
-        # SK 관련 키워드
-        if any(sk_term in text_lower for sk_term in ["sk", "에스케이", "sk에너지", "sk이노베이션"]):
-            score += 5
-        
-        # 정유/에너지 산업 키워드
-        if any(term in text_lower for term in ["정유", "석유", "화학", "에너지"]):
-            score += 2
-        
-        # 경쟁사 관련 키워드
-        if any(comp in text_lower for comp in ["gs칼텍스", "현대오일뱅크", "s-oil", "에쓰오일"]):
-            score += 1
-        
-        return min(score, 10)
-
-    def _calc_relevance_score(self, row) -> int:
-        """종합 관련도 점수 계산"""
-        title = str(row.get('제목', '')).lower()
-        summary = str(row.get('요약', '')).lower()
-        full_text = f"{title} {summary}"
-        
-        score = 0
-        
-        # 회사명 매칭 (가장 높은 가중치)
-        for kw in self.company_keywords:
-            if kw.lower() in full_text:
-                score += 10
-        
-        # 산업 키워드 매칭
-        for kw in self.industry_keywords:
-            if kw.lower() in full_text:
-                score += 3
-        
-        # 비즈니스 키워드 매칭
-        for kw in self.business_keywords:
-            if kw.lower() in full_text:
-                score += 2
-        
-        # 트렌드 키워드 매칭
-        for kw in self.trend_keywords:
-            if kw.lower() in full_text:
-                score += 1
-        
-        return score
-
-    def _extract_company(self, text: str) -> str:
-        """회사명 추출 개선"""
-        text_lower = str(text).lower()
-        
-        # 정확한 회사명 매칭
-        company_mapping = {
-            "sk에너지": "SK에너지",
-            "sk이노베이션": "SK이노베이션", 
-            "gs칼텍스": "GS칼텍스",
-            "hd현대오일뱅크": "HD현대오일뱅크",
-            "현대오일뱅크": "HD현대오일뱅크",
-            "s-oil": "S-Oil",
-            "에쓰오일": "S-Oil"
+        return {
+            "키워드": keywords,
+            "영향도": importance,
+            "회사": company,
+            "SK관련도": sk_relevance,
+            "관련도점수": relevance,
         }
-        
-        for key, value in company_mapping.items():
-            if key in text_lower:
-                return value
-        
-        return "기타"
     
     @staticmethod
     def _parse_date(date_str: str) -> str:
-        try:
-            return parser.parse(date_str).strftime("%Y-%m-%d %H:%M")
-        except:
-            return datetime.now().strftime("%Y-%m-%d %H:%M")
\ No newline at end of file
+        parsed = _parse_date_cached(date_str)
+        if parsed is None:
+            return datetime.now().strftime("%Y-%m-%d %H:%M")
+        return parsed
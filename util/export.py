@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 import io
 import os
+import re
+import tempfile
 import pandas as pd
 from datetime import datetime
 
 # PDF 라이브러리
 try:
-    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.pagesizes import letter, A4
     from reportlab.lib import colors
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image as RLImage
@@ -58,8 +60,6 @@ def create_enhanced_pdf_report(
         return None
 
     # ---------- 1. 내부 헬퍼 ----------
-    import re, tempfile
-
     def _fig_to_png_bytes(fig, width=900, height=450):
         """Plotly 차트를 PNG 바이트로 변환. Kaleido 없으면 None 반환."""
         try:
@@ -152,7 +152,6 @@ def create_enhanced_pdf_report(
     )
 
     # ---------- 4. PDF 작성 (A4 규격) ----------
-    from reportlab.lib.pagesizes import A4  # 상단에서 이미 임포트되어 있으면 생략 가능
     buff = io.BytesIO()
 
     def _page_no(canvas, doc):